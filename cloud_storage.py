@@ -4,6 +4,8 @@ from typing import Optional, List
 
 class CloudStorage(ABC):
     """Abstract base class for cloud storage operations."""
+
+    __slots__ = ()
     
     @abstractmethod
     def add_file(self, name: str, size: int) -> bool:
@@ -1,20 +1,90 @@
+import heapq
+import sys
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from operator import neg
 from typing import Optional, List
 from cloud_storage import CloudStorage
 
 
+_MAX_CHAR = chr(0x10FFFF)
+_NLARGEST_CACHE_SIZE = 64
+# Batches of pending name changes up to this size are applied to the sorted
+# index one bisection at a time; larger batches rebuild it in one pass.
+_NAME_BATCH_LIMIT = 64
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every string starting with ``prefix``.
+
+    Returns None when no such bound exists (empty prefix, or a prefix made
+    only of the maximal code point), meaning the range is open-ended.
+    """
+    stripped = prefix.rstrip(_MAX_CHAR)
+    if not stripped:
+        return None
+    return stripped[:-1] + chr(ord(stripped[-1]) + 1)
+
+
+class _User:
+    """Storage quota bookkeeping for a single non-admin user."""
+
+    __slots__ = ("capacity", "remaining", "backup")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.remaining = capacity
+        self.backup: Optional[dict[str, int]] = None
+
+
 class CloudStorageImpl(CloudStorage):
-    
-    def __init__(self):
+
+    __slots__ = (
+        "_files",
+        "_owners",
+        "_users",
+        "_admin_backup",
+        "_files_by_owner",
+        "_names",
+        "_pending_names",
+        "_deleted_names",
+        "_gen",
+        "_cache_gen",
+        "_nlargest_cache",
+    )
+
+    def __init__(self) -> None:
         self._files: dict[str, int] = {}
         self._owners: dict[str, str] = {}
-        self._users: dict[str, dict[str, int]] = {}
-        self._backups: dict[str, dict[str, int]] = {}
+        self._users: dict[str, _User] = {}
+        self._admin_backup: Optional[dict[str, int]] = None
+        self._files_by_owner: dict[str, dict[str, int]] = {"admin": {}}
+        # Sorted name index for prefix queries, maintained lazily: names added
+        # since the last get_n_largest sit in _pending_names, and names
+        # removed from _names in _deleted_names, until the next query folds
+        # them in. Writes stay O(1), and neither buffer outgrows the live
+        # files (pending) or _names (deleted).
+        self._names: list[str] = []
+        self._pending_names: set[str] = set()
+        self._deleted_names: set[str] = set()
+        # Bumped on every change to file names or sizes. The get_n_largest
+        # cache only holds results computed at generation _cache_gen and is
+        # emptied on the first query after a change.
+        self._gen = 0
+        self._cache_gen = 0
+        self._nlargest_cache: OrderedDict[tuple[str, int], list[str]] = (
+            OrderedDict()
+        )
 
     def add_file(self, name: str, size: int) -> bool:
         if name in self._files:
             return False
+        name = sys.intern(name)
+        self._gen += 1
         self._files[name] = size
         self._owners[name] = "admin"
+        self._files_by_owner["admin"][name] = size
+        self._index_name(name)
         return True
 
     def get_file_size(self, name: str) -> Optional[int]:
@@ -24,36 +94,60 @@ class CloudStorageImpl(CloudStorage):
         size = self._files.pop(name, None)
         if size is None:
             return None
+        self._gen += 1
         owner = self._owners.pop(name)
-        if owner in self._users:
-            self._users[owner]["used"] -= size
+        self._unindex_name(name)
+        del self._files_by_owner[owner][name]
+        user = self._users.get(owner)
+        if user is not None:
+            user.remaining += size
         return size
 
     def get_n_largest(self, prefix: str, n: int) -> List[str]:
-        matches = [
-            (path, sz)
-            for path, sz in self._files.items()
-            if path.startswith(prefix)
-        ]
-        matches.sort(key=lambda x: (-x[1], x[0]))
-        return [f"{path}({sz})" for path, sz in matches[:n]]
+        if n <= 0:
+            return []
+        cache = self._nlargest_cache
+        if self._cache_gen != self._gen:
+            cache.clear()
+            self._cache_gen = self._gen
+        key = (prefix, n)
+        cached = cache.get(key)
+        if cached is not None:
+            cache.move_to_end(key)
+            return list(cached)
+        names = self._sorted_names()
+        lo = bisect_left(names, prefix)
+        upper = _prefix_upper_bound(prefix)
+        hi = len(names) if upper is None else bisect_left(names, upper, lo)
+        candidates = names[lo:hi]
+        neg_sizes = map(neg, map(self._files.__getitem__, candidates))
+        top = heapq.nsmallest(n, zip(neg_sizes, candidates))
+        result = [f"{path}({-neg_sz})" for neg_sz, path in top]
+        cache[key] = result
+        if len(cache) > _NLARGEST_CACHE_SIZE:
+            cache.popitem(last=False)
+        return list(result)
 
     def add_user(self, user_id: str, capacity: int) -> bool:
         if user_id == "admin" or user_id in self._users:
             return False
-        self._users[user_id] = {"capacity": capacity, "used": 0}
+        self._users[user_id] = _User(capacity)
         return True
 
     def add_file_by(self, user_id: str, name: str, size: int) -> Optional[int]:
-        if user_id not in self._users or name in self._files:
+        user = self._users.get(user_id)
+        if user is None or name in self._files:
             return None
-        user = self._users[user_id]
-        if user["used"] + size > user["capacity"]:
+        if size > user.remaining:
             return None
+        name = sys.intern(name)
+        self._gen += 1
         self._files[name] = size
         self._owners[name] = user_id
-        user["used"] += size
-        return user["capacity"] - user["used"]
+        self._files_by_owner.setdefault(user_id, {})[name] = size
+        self._index_name(name)
+        user.remaining -= size
+        return user.remaining
 
     def merge_user(self, user_id_1: str, user_id_2: str) -> Optional[int]:
         if (
@@ -64,71 +158,113 @@ class CloudStorageImpl(CloudStorage):
             return None
         u1 = self._users[user_id_1]
         u2 = self._users[user_id_2]
-        for path, owner in list(self._owners.items()):
-            if owner == user_id_2:
-                self._owners[path] = user_id_1
-        u1["capacity"] += u2["capacity"]
-        u1["used"] += u2["used"]
+        paths = self._files_by_owner.pop(user_id_2, None)
+        if paths:
+            self._owners.update(dict.fromkeys(paths, user_id_1))
+            self._files_by_owner.setdefault(user_id_1, {}).update(paths)
+        u1.capacity += u2.capacity
+        u1.remaining += u2.remaining
         del self._users[user_id_2]
-        self._backups.pop(user_id_2, None)
-        return u1["capacity"] - u1["used"]
+        return u1.remaining
 
     def backup_user(self, user_id: str) -> Optional[int]:
-        if user_id != "admin" and user_id not in self._users:
+        user = self._users.get(user_id)
+        if user is None and user_id != "admin":
             return None
-        snapshot = {
-            path: self._files[path]
-            for path, owner in self._owners.items()
-            if owner == user_id
-        }
-        self._backups[user_id] = snapshot
+        snapshot = dict(self._files_by_owner.get(user_id, {}))
+        if user is None:
+            self._admin_backup = snapshot
+        else:
+            user.backup = snapshot
         return len(snapshot)
 
     def restore_user(self, user_id: str) -> Optional[int]:
-        if user_id != "admin" and user_id not in self._users:
+        user = self._users.get(user_id)
+        if user is None and user_id != "admin":
             return None
-        backup = self._backups.get(user_id)
-        current = [p for p, o in self._owners.items() if o == user_id]
+        backup = self._admin_backup if user is None else user.backup
+        self._gen += 1
+        owned = self._files_by_owner.setdefault(user_id, {})
         if backup is None:
-            for path in current:
+            for path in owned:
                 self._files.pop(path, None)
                 self._owners.pop(path, None)
-            if user_id in self._users:
-                self._users[user_id]["used"] = 0
+                self._unindex_name(path)
+            owned.clear()
+            if user is not None:
+                user.remaining = user.capacity
             return 0
-        for path in current:
-            if path not in backup:
-                self._files.pop(path, None)
-                self._owners.pop(path, None)
+        for path in owned.keys() - backup.keys():
+            old_size = owned.pop(path)
+            del self._files[path]
+            del self._owners[path]
+            self._unindex_name(path)
+            if user is not None:
+                user.remaining += old_size
         restored = 0
         for path, size in backup.items():
             if path in self._files:
                 if self._owners[path] != user_id:
                     if user_id == "admin":
                         old_owner = self._owners[path]
-                        old_size = self._files[path]
-                        if old_owner in self._users:
-                            self._users[old_owner]["used"] -= old_size
+                        old_size = self._files_by_owner[old_owner].pop(path)
+                        old_user = self._users.get(old_owner)
+                        if old_user is not None:
+                            old_user.remaining += old_size
                         self._files[path] = size
                         self._owners[path] = "admin"
+                        owned[path] = size
                         restored += 1
                     continue
-                if user_id in self._users:
-                    diff = size - self._files[path]
-                    self._users[user_id]["used"] += diff
+                if user is not None:
+                    user.remaining -= size - owned[path]
                 self._files[path] = size
+                owned[path] = size
                 restored += 1
             else:
                 self._files[path] = size
                 self._owners[path] = user_id
-                if user_id in self._users:
-                    self._users[user_id]["used"] += size
+                owned[path] = size
+                self._index_name(path)
+                if user is not None:
+                    user.remaining -= size
                 restored += 1
-        if user_id in self._users:
-            total = sum(
-                self._files[p]
-                for p, o in self._owners.items()
-                if o == user_id
-            )
-            self._users[user_id]["used"] = total
-        return restored
\ No newline at end of file
+        return restored
+
+    def _index_name(self, name: str) -> None:
+        deleted = self._deleted_names
+        if name in deleted:
+            # Still present in _names from before its deletion
+            deleted.discard(name)
+        else:
+            self._pending_names.add(name)
+
+    def _unindex_name(self, name: str) -> None:
+        pending = self._pending_names
+        if name in pending:
+            pending.discard(name)
+        else:
+            self._deleted_names.add(name)
+
+    def _sorted_names(self) -> list[str]:
+        names = self._names
+        pending = self._pending_names
+        deleted = self._deleted_names
+        if deleted:
+            if len(deleted) <= _NAME_BATCH_LIMIT:
+                for name in deleted:
+                    del names[bisect_left(names, name)]
+            else:
+                names = [name for name in names if name not in deleted]
+            deleted.clear()
+        if len(pending) <= _NAME_BATCH_LIMIT:
+            for name in pending:
+                insort(names, name)
+        else:
+            # Timsort merges the sorted run with the new tail in
+            # O(N + k log k) rather than re-sorting from scratch.
+            names.extend(pending)
+            names.sort()
+        pending.clear()
+        self._names = names
+        return names
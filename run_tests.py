@@ -3,20 +3,27 @@
 Test runner for the cloud storage implementation.
 
 This module contains comprehensive test cases for the CloudStorage system,
-covering file operations, user management, and backup/restore functionality.
-All tests include timeout protection to prevent infinite loops.
+covering file operations, user management, and backup/restore functionality,
+as well as the timeout decorator itself. All storage tests include timeout
+protection to prevent infinite loops.
 """
 
 import unittest
 import sys
 import os
+import signal
+import subprocess
+import threading
+import time
 
 # Add the current directory to the path to ensure imports work correctly
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import required modules
-from timeout_decorator import timeout  # Decorator to prevent test timeouts
+from timeout_decorator import timeout, TimeoutError  # Decorator to prevent test timeouts
 from cloud_storage_impl import CloudStorageImpl  # The implementation to test
+from cloud_storage_impl import _prefix_upper_bound  # Prefix range helper
+from cloud_storage_impl import _NLARGEST_CACHE_SIZE  # Bound on cached queries
 
 
 class TestCloudStorage(unittest.TestCase):
@@ -126,11 +133,328 @@ class TestCloudStorage(unittest.TestCase):
         self.assertEqual(self.storage.get_file_size('/user1/file1.txt'), 100)
         self.assertEqual(self.storage.get_file_size('/user1/file2.txt'), 200)
 
+    @timeout(0.4)
+    def test_get_n_largest_after_changes(self):
+        """Test that repeated queries reflect file changes made between them."""
+        self.storage.add_user('user1', 1000)
+        self.storage.add_file('/docs/a.txt', 100)
+        self.assertEqual(self.storage.get_n_largest('/docs/', 2), ['/docs/a.txt(100)'])
+
+        # Adding, deleting and restoring files must change the next answer
+        self.storage.add_file_by('user1', '/docs/b.txt', 200)
+        self.assertEqual(self.storage.get_n_largest('/docs/', 2), ['/docs/b.txt(200)', '/docs/a.txt(100)'])
+        self.storage.backup_user('user1')
+        self.storage.delete_file('/docs/b.txt')
+        self.assertEqual(self.storage.get_n_largest('/docs/', 2), ['/docs/a.txt(100)'])
+        self.storage.restore_user('user1')
+        self.assertEqual(self.storage.get_n_largest('/docs/', 2), ['/docs/b.txt(200)', '/docs/a.txt(100)'])
+
+        # Mutating a returned list must not affect later results
+        self.storage.get_n_largest('/docs/', 2).clear()
+        self.assertEqual(self.storage.get_n_largest('/docs/', 2), ['/docs/b.txt(200)', '/docs/a.txt(100)'])
+
+    @timeout(0.4)
+    def test_get_n_largest_cache(self):
+        """Test that repeated queries are cached and the cache stays bounded."""
+        self.storage.add_file('/docs/a.txt', 100)
+        self.storage.add_file('/docs/b.txt', 200)
+
+        # Two identical queries with no write in between share one entry
+        first = self.storage.get_n_largest('/docs/', 2)
+        second = self.storage.get_n_largest('/docs/', 2)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.storage._nlargest_cache), 1)
+
+        # Distinct (prefix, n) queries beyond the limit evict the oldest ones
+        for n in range(1, _NLARGEST_CACHE_SIZE + 10):
+            self.storage.get_n_largest('/', n)
+        self.assertEqual(len(self.storage._nlargest_cache), _NLARGEST_CACHE_SIZE)
+        self.assertNotIn(('/docs/', 2), self.storage._nlargest_cache)
+
+        # A hit moves its entry to the most recently used end
+        self.storage.get_n_largest('/', 20)
+        self.assertEqual(next(reversed(self.storage._nlargest_cache)), ('/', 20))
+        self.assertEqual(self.storage.get_n_largest('/', 20), ['/docs/b.txt(200)', '/docs/a.txt(100)'])
+
+    @timeout(0.4)
+    def test_prefix_upper_bound_edge_cases(self):
+        """Test prefix range bounds around the empty and maximal-character prefixes."""
+        max_char = chr(0x10FFFF)
+        self.assertEqual(_prefix_upper_bound('/docs'), '/doct')
+        # No upper bound: every name matches, or nothing sorts above the prefix
+        self.assertIsNone(_prefix_upper_bound(''))
+        self.assertIsNone(_prefix_upper_bound(max_char))
+        self.assertIsNone(_prefix_upper_bound(max_char * 3))
+        # Trailing maximal characters carry over into the previous character
+        self.assertEqual(_prefix_upper_bound('/a' + max_char), '/b')
+        self.assertEqual(_prefix_upper_bound('/a' + max_char * 2), '/b')
+
+        # The same prefixes select the right files through get_n_largest
+        self.storage.add_file('/a', 1)
+        self.storage.add_file('/a' + max_char, 2)
+        self.storage.add_file('/a' + max_char + 'x', 3)
+        self.storage.add_file('/b', 4)
+        self.storage.add_file(max_char, 5)
+        self.storage.add_file(max_char + 'y', 6)
+        self.assertEqual(self.storage.get_n_largest('/a' + max_char, 5),
+                         ['/a' + max_char + 'x(3)', '/a' + max_char + '(2)'])
+        self.assertEqual(self.storage.get_n_largest(max_char, 5),
+                         [max_char + 'y(6)', max_char + '(5)'])
+        self.assertEqual(len(self.storage.get_n_largest('', 10)), 6)
+
+    @timeout(0.4)
+    def test_get_n_largest_after_bulk_changes(self):
+        """Test prefix queries after batches of adds and deletes larger than the incremental limit."""
+        for i in range(200):
+            self.storage.add_file(f'/bulk/{i:03d}', i)
+        self.assertEqual(self.storage.get_n_largest('/bulk/', 2), ['/bulk/199(199)', '/bulk/198(198)'])
+        for i in range(100, 200):
+            self.storage.delete_file(f'/bulk/{i:03d}')
+        self.storage.add_file('/bulk/150', 1000)
+        self.assertEqual(self.storage.get_n_largest('/bulk/', 2), ['/bulk/150(1000)', '/bulk/099(99)'])
+
+
+    @timeout(0.4)
+    def test_name_index_buffers_stay_bounded(self):
+        """Test that add/delete churn without prefix queries doesn't grow the name buffers."""
+        for i in range(1000):
+            self.storage.add_file(f'/churn/{i}', i)
+            self.storage.delete_file(f'/churn/{i}')
+        self.assertEqual(len(self.storage._pending_names), 0)
+        self.assertEqual(len(self.storage._deleted_names), 0)
+
+        # Restores replace files without queries in between
+        self.storage.add_user('user1', 1000)
+        for i in range(10):
+            self.storage.add_file_by('user1', f'/user1/{i}', 1)
+        self.storage.backup_user('user1')
+        for _ in range(20):
+            self.storage.delete_file('/user1/0')
+            self.storage.restore_user('user1')
+        self.assertLessEqual(len(self.storage._pending_names), 10)
+        self.assertEqual(len(self.storage._deleted_names), 0)
+
+        # Deleting indexed names is bounded by the index itself
+        self.assertEqual(len(self.storage.get_n_largest('/', 20)), 10)
+        for i in range(10):
+            self.storage.delete_file(f'/user1/{i}')
+        self.assertEqual(len(self.storage._pending_names), 0)
+        self.assertLessEqual(len(self.storage._deleted_names), len(self.storage._names))
+
+
+def run_in_thread(func):
+    """Call func on a non-main thread, where timeout falls back to worker threads."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = func()
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(5)
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('result')
+
+
+class TestTimeoutDecorator(unittest.TestCase):
+    """
+    Test cases for the timeout decorator.
+
+    Calls from the main thread are limited with a SIGALRM interval timer;
+    calls from other threads run on daemon worker threads instead.
+    """
+
+    def test_timer_returns_and_raises(self):
+        """Test results and exceptions on the main-thread timer path."""
+        @timeout(0.5)
+        def double(x):
+            return x * 2
+
+        @timeout(0.5)
+        def fail():
+            raise ValueError('boom')
+
+        self.assertEqual(double(21), 42)
+        with self.assertRaises(ValueError):
+            fail()
+        # Nothing is left armed once the call returns
+        self.assertEqual(signal.getitimer(signal.ITIMER_REAL), (0.0, 0.0))
+
+    def test_timer_times_out(self):
+        """Test that a slow call on the main thread times out close to its limit."""
+        @timeout(0.05)
+        def slow():
+            time.sleep(1)
+
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            slow()
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(signal.getitimer(signal.ITIMER_REAL), (0.0, 0.0))
+
+    def test_timer_keeps_outer_deadline_after_inner_call(self):
+        """Test that an inner timeout returning early doesn't cancel the outer one."""
+        @timeout(0.1)
+        def inner():
+            return 'inner'
+
+        @timeout(0.2)
+        def outer():
+            inner()
+            time.sleep(1)
+
+        start = time.monotonic()
+        with self.assertRaisesRegex(TimeoutError, 'outer'):
+            outer()
+        self.assertLess(time.monotonic() - start, 0.6)
+
+    def test_timer_outer_deadline_due_before_inner(self):
+        """Test that a longer inner timeout doesn't extend a shorter outer one."""
+        @timeout(1)
+        def inner():
+            time.sleep(2)
+
+        @timeout(0.1)
+        def outer():
+            inner()
+
+        start = time.monotonic()
+        with self.assertRaisesRegex(TimeoutError, 'outer'):
+            outer()
+        self.assertLess(time.monotonic() - start, 0.6)
+
+    def run_with_outer_timer(self, handler, func):
+        """Call func while a periodic 10ms SIGALRM timer with the given handler is armed."""
+        old_handler = signal.signal(signal.SIGALRM, handler)
+        signal.setitimer(signal.ITIMER_REAL, 0.01, 0.01)
+        try:
+            result = func()
+            # The caller's periodic timer is still running afterwards
+            self.assertEqual(signal.getitimer(signal.ITIMER_REAL)[1], 0.01)
+            return result
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+
+    def test_timer_forwards_non_raising_outer_handler(self):
+        """Test that a caller's periodic timer keeps ticking without timing the call out."""
+        ticks = []
+
+        @timeout(1)
+        def work():
+            time.sleep(0.1)
+            return 'done'
+
+        result = self.run_with_outer_timer(lambda signum, frame: ticks.append(signum), work)
+        self.assertEqual(result, 'done')
+        self.assertGreater(len(ticks), 0)
+
+    def test_timer_ignores_outer_timer_with_ignored_signal(self):
+        """Test that an outer timer whose SIGALRM is ignored doesn't time the call out."""
+        @timeout(1)
+        def work():
+            time.sleep(0.1)
+            return 'done'
+
+        self.assertEqual(self.run_with_outer_timer(signal.SIG_IGN, work), 'done')
+
+    def test_timer_still_times_out_under_outer_ticks(self):
+        """Test that the call's own deadline is enforced while an outer timer keeps ticking."""
+        @timeout(0.1)
+        def slow():
+            time.sleep(1)
+
+        def call():
+            start = time.monotonic()
+            with self.assertRaises(TimeoutError):
+                slow()
+            self.assertLess(time.monotonic() - start, 0.5)
+
+        self.run_with_outer_timer(lambda signum, frame: None, call)
+
+    def test_non_positive_seconds_rejected(self):
+        """Test that a zero or negative limit is rejected instead of disabling the timeout."""
+        with self.assertRaises(ValueError):
+            timeout(0)
+        with self.assertRaises(ValueError):
+            timeout(-1)
+
+    def test_thread_fallback_returns_and_raises(self):
+        """Test results and exceptions passing through the worker thread."""
+        @timeout(0.5)
+        def double(x):
+            return x * 2
+
+        @timeout(0.5)
+        def fail():
+            raise ValueError('boom')
+
+        self.assertEqual(run_in_thread(lambda: double(21)), 42)
+        with self.assertRaises(ValueError):
+            run_in_thread(fail)
+
+    def test_thread_fallback_times_out(self):
+        """Test that a slow call off the main thread times out and leaves only daemon threads."""
+        @timeout(0.05)
+        def slow():
+            time.sleep(0.3)
+
+        with self.assertRaises(TimeoutError):
+            run_in_thread(slow)
+        # The abandoned call must not be able to block interpreter exit
+        for thread in threading.enumerate():
+            if thread is not threading.main_thread():
+                self.assertTrue(thread.daemon)
+
+    def test_thread_fallback_nested_calls(self):
+        """Test a decorated function calling another one off the main thread."""
+        @timeout(0.5)
+        def inner():
+            return 'inner'
+
+        @timeout(0.5)
+        def outer():
+            return inner() + '+outer'
+
+        self.assertEqual(run_in_thread(outer), 'inner+outer')
+
+    def test_thread_fallback_does_not_block_exit(self):
+        """Test that a timed-out call off the main thread doesn't hang interpreter shutdown."""
+        script = (
+            'import threading, time\n'
+            'from timeout_decorator import timeout, TimeoutError\n'
+            '@timeout(0.05)\n'
+            'def hang():\n'
+            '    time.sleep(60)\n'
+            'def target():\n'
+            '    try:\n'
+            '        hang()\n'
+            '    except TimeoutError:\n'
+            '        pass\n'
+            'thread = threading.Thread(target=target)\n'
+            'thread.start()\n'
+            'thread.join()\n'
+        )
+        completed = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            timeout=10,
+        )
+        self.assertEqual(completed.returncode, 0)
+
 
 def run_tests():
     """Run all tests."""
     # Create test suite
-    suite = unittest.TestLoader().loadTestsFromTestCase(TestCloudStorage)
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite([
+        loader.loadTestsFromTestCase(TestCloudStorage),
+        loader.loadTestsFromTestCase(TestTimeoutDecorator),
+    ])
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
@@ -1,5 +1,6 @@
 import signal
 import functools
+import queue
 import threading
 import time
 
@@ -9,41 +10,136 @@ class TimeoutError(Exception):
     pass
 
 
+# Task queues of idle daemon worker threads used by the thread-based
+# fallback, so each call doesn't pay for creating a new thread. A call that
+# finds no idle worker (another call, or its own caller, is still running on
+# each of them) starts a new one. Workers are daemons, so a call that never
+# returns cannot keep the interpreter from exiting.
+_idle_workers = []
+_idle_workers_lock = threading.Lock()
+
+
+def _worker_loop(tasks):
+    while True:
+        func, args, kwargs, outcome, done = tasks.get()
+        try:
+            outcome[0] = func(*args, **kwargs)
+        except BaseException as e:
+            outcome[1] = e
+        with _idle_workers_lock:
+            _idle_workers.append(tasks)
+        done.set()
+        # Don't keep the last call's arguments and result alive while idle
+        del func, args, kwargs, outcome, done
+
+
+def _run_on_worker(func, args, kwargs):
+    with _idle_workers_lock:
+        tasks = _idle_workers.pop() if _idle_workers else None
+    if tasks is None:
+        tasks = queue.SimpleQueue()
+        worker = threading.Thread(target=_worker_loop, args=(tasks,), daemon=True)
+        worker.start()
+    outcome = [None, None]
+    done = threading.Event()
+    tasks.put((func, args, kwargs, outcome, done))
+    return outcome, done
+
+
+# Shortest delay used when re-arming a timer whose deadline has already
+# passed; setitimer treats 0 as "disarm".
+_MIN_DELAY = 1e-6
+
+
+def _call_with_itimer(func, args, kwargs, seconds, message):
+    # ITIMER_REAL may already be armed, by an enclosing timeout or by the
+    # caller's own (possibly periodic) timer. Share it: always arm whichever
+    # deadline is due first, pass the outer timer's expiries on to its
+    # handler, and only time out once our own deadline has passed.
+    started = time.monotonic()
+    deadline = started + seconds
+    outer_delay, outer_interval = signal.getitimer(signal.ITIMER_REAL)
+    outer_due = [started + outer_delay if outer_delay else None]
+
+    def _outer_is_next():
+        return outer_due[0] is not None and outer_due[0] < deadline
+
+    def _arm():
+        due = outer_due[0] if _outer_is_next() else deadline
+        signal.setitimer(
+            signal.ITIMER_REAL, max(due - time.monotonic(), _MIN_DELAY)
+        )
+
+    def _handle_timeout(signum, frame):
+        if not _outer_is_next():
+            raise TimeoutError(message)
+        # The outer timer expired: schedule its next expiry, if periodic,
+        # and keep waiting for ours. Its handler may raise (e.g. an
+        # enclosing timeout), which the finally below cleans up after.
+        if outer_interval:
+            outer_due[0] = time.monotonic() + outer_interval
+        else:
+            outer_due[0] = None
+        _arm()
+        if callable(old_handler):
+            old_handler(signum, frame)
+
+    old_handler = signal.signal(signal.SIGALRM, _handle_timeout)
+    _arm()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, old_handler)
+        if outer_due[0] is not None:
+            remaining = outer_due[0] - time.monotonic()
+            signal.setitimer(
+                signal.ITIMER_REAL, max(remaining, _MIN_DELAY), outer_interval
+            )
+
+
+def _can_use_itimer():
+    return (
+        hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    )
+
+
 def timeout(seconds):
     """
     Decorator that raises a TimeoutError if the function takes longer than specified seconds.
+
+    Uses a SIGALRM interval timer when available (Unix, main thread), which
+    supports sub-second limits without starting a thread and nests inside
+    other timeouts. Otherwise the call runs on a reusable daemon worker
+    thread and is abandoned after the limit.
     
     Args:
-        seconds: Maximum time in seconds before timeout
+        seconds: Maximum time in seconds before timeout; must be positive
         
     Returns:
         Decorated function
+
+    Raises:
+        ValueError: If seconds is not positive
     """
+    if seconds <= 0:
+        raise ValueError(f"timeout must be positive, got {seconds!r}")
+
     def decorator(func):
+        message = f"Function {func.__name__} timed out after {seconds} seconds"
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            result = [None]
-            exception = [None]
-            
-            def target():
-                try:
-                    result[0] = func(*args, **kwargs)
-                except Exception as e:
-                    exception[0] = e
-            
-            thread = threading.Thread(target=target)
-            thread.daemon = True
-            thread.start()
-            thread.join(seconds)
-            
-            if thread.is_alive():
-                # Thread is still running, timeout occurred
-                raise TimeoutError(f"Function {func.__name__} timed out after {seconds} seconds")
-            
-            if exception[0]:
-                raise exception[0]
-            
-            return result[0]
+            if _can_use_itimer():
+                return _call_with_itimer(func, args, kwargs, seconds, message)
+
+            outcome, done = _run_on_worker(func, args, kwargs)
+            if not done.wait(seconds):
+                raise TimeoutError(message)
+            if outcome[1] is not None:
+                raise outcome[1]
+            return outcome[0]
         
         return wrapper
     return decorator